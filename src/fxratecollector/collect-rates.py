@@ -1,202 +1,622 @@
 import argparse
 import os
-from datetime import datetime
+import random
+import re
+import shelve
+import socket
+import threading
+from collections.abc import Collection
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
 from pathlib import Path
-from time import sleep
+from time import monotonic, sleep, time
 from typing import Any
 
-import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+
+try:
+    # Optional faster JSON parser
+    import orjson
+except ImportError:
+    orjson = None
 
 
 class FixerException(Exception):
-    def __init__(self, error_code: int, message: str):
+    def __init__(self, error_code: int, message: str, retry_after: float | None = None):
         """Initializes a FixerException with an error code and message.
 
         Args:
             error_code: The error code from the Fixer.io API.
             message: A descriptive error message.
+            retry_after: Seconds to wait before retrying, if the API provided it.
         """
         self.error_code = error_code
         self.message = message
+        self.retry_after = retry_after
         super().__init__(f"API error {error_code}: {message}")
 
 
+_DATE_RE: re.Pattern[str] = re.compile(r"(\d{4})-(\d{2})-(\d{2})")
+# Fixer.io has no rates before 1999
+_MIN_YEAR: int = 1999
+
+
+def _parse_date(value: str) -> date:
+    """Parses a date in 'YYYY-MM-DD' format.
+
+    Args:
+        value: The date string.
+
+    Returns:
+        The parsed date.
+
+    Raises:
+        ValueError: If the date format is invalid or the date is before 1999.
+    """
+    match = _DATE_RE.fullmatch(value)
+    if match:
+        year, month, day = map(int, match.groups())
+        if year >= _MIN_YEAR:
+            try:
+                return date(year, month, day)
+            except ValueError:
+                pass
+    raise ValueError(f"Invalid date format: {value}. Expected format: YYYY-MM-DD")
+
+
+def _normalize_currencies(currencies: Collection[str]) -> frozenset[str]:
+    """Strips, uppercases and deduplicates currency codes, skipping blank ones.
+
+    Args:
+        currencies: Currency codes.
+
+    Returns:
+        The set of normalized currency codes.
+
+    Raises:
+        ValueError: If the list has no codes or a code is not three letters.
+    """
+    normalized = frozenset(c.strip().upper() for c in currencies if c.strip())
+    if not normalized:
+        raise ValueError("Currencies list cannot be empty.")
+
+    invalid = sorted(c for c in normalized if len(c) != 3 or not c.isalpha())
+    if invalid:
+        raise ValueError(f"Invalid currency codes: {', '.join(invalid)}. Expected three-letter ISO 4217 codes")
+
+    return normalized
+
+
+def _to_usd_base(rates_eur_base: dict[str, float], eur_to_usd_rate: float, keep_usd: bool) -> dict[str, float]:
+    """Converts EUR-based rates to USD base.
+
+    Args:
+        rates_eur_base: Dictionary mapping currency codes to their EUR exchange rate.
+        eur_to_usd_rate: The EUR to USD exchange rate.
+        keep_usd: Whether to include USD itself in the result.
+
+    Returns:
+        A dictionary mapping currency codes to their USD exchange rate.
+    """
+    # Scale by the reciprocal once, then fix up the USD slot instead of
+    # special-casing it during the conversion
+    inv: float = 1.0 / eur_to_usd_rate
+    rates_usd_base: dict[str, float] = {currency: rate * inv for currency, rate in rates_eur_base.items()}
+    if keep_usd:
+        rates_usd_base["USD"] = 1.0
+    else:
+        rates_usd_base.pop("USD", None)
+
+    return rates_usd_base
+
+
+class _KeepAliveAdapter(HTTPAdapter):
+    """HTTPAdapter that enables TCP keepalive on pooled sockets, so idle
+    connections survive pauses between calls of long batches."""
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        kwargs["socket_options"] = HTTPConnection.default_socket_options + [
+            (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        ]
+        super().init_poolmanager(*args, **kwargs)
+
+
 class FixerClient:
     BASE_URL: str = "https://data.fixer.io/api/"
-    def __init__(self, api_key: str, retries: int = 1):
+    USER_AGENT: str = "fxratecollector"
+    # (connect, read) timeouts in seconds
+    TIMEOUT: tuple[float, float] = (5, 30)
+    # Longest range the timeseries endpoint accepts in one call, in days
+    TIMESERIES_MAX_DAYS: int = 365
+    # Maximum number of pooled connections to Fixer.io
+    POOL_SIZE: int = 16
+    # Seconds to keep cached responses that may still change (latest and today's rates)
+    CACHE_TTL: int = 3600
+    # Seconds to remember that the plan does not support an endpoint
+    UNSUPPORTED_TTL: int = 86400
+    # Exponential backoff for rate-limited calls, in seconds
+    BACKOFF_BASE: float = 0.5
+    BACKOFF_CAP: float = 60
+    # Maximum total time to spend waiting on retries of a single call, in seconds
+    MAX_RETRY_WAIT: float = 120
+    # Number of consecutive failed calls after which further calls are rejected
+    # for BREAKER_COOLDOWN seconds, so a broken setup does not burn the API quota
+    BREAKER_THRESHOLD: int = 5
+    BREAKER_COOLDOWN: float = 300
+
+    def __init__(
+        self,
+        api_key: str,
+        retries: int = 5,
+        cache_path: str | Path | None = None,
+        refresh: bool = False,
+    ):
+        """Initializes a FixerClient.
+
+        Args:
+            api_key: The Fixer.io API access key.
+            retries: How many times to retry a call that hit the rate limit.
+            cache_path: Path of the on-disk response cache. If None, responses are not cached.
+            refresh: If True, ignore cached responses and always call the API. Fresh
+                responses are still written to the cache.
+        """
         self._api_key: str = api_key
         self.retries: int = retries
+        self._cache_path: str | None = str(Path(cache_path).expanduser()) if cache_path else None
+        self.refresh: bool = refresh
+        # shelve does not support concurrent access, see get_rates_bulk
+        self._cache_lock: threading.Lock = threading.Lock()
+        self._fail_count: int = 0
+        self._open_until: float = 0.0
+        self._breaker_lock: threading.Lock = threading.Lock()
+        # EUR->USD rates of past dates, they never change
+        self._eur_usd_cache: dict[str, float] = {}
+        # Endpoints the current plan does not support, mapped to the API error info
+        self._unsupported: dict[str, str] = {}
         
         if not self._api_key:
             raise ValueError(
                 "Fixer.io API key not found. Pass it as argument or set FIXER_API_KEY environment variable."
             )
 
+        # Keep the TLS connections to Fixer.io alive between calls. All calls go to
+        # a single host, so one pool is enough.
+        self._session: requests.Session = requests.Session()
+        self._session.mount(
+            self.BASE_URL,
+            _KeepAliveAdapter(pool_connections=1, pool_maxsize=self.POOL_SIZE, pool_block=False, max_retries=0),
+        )
+        self._session.headers["User-Agent"] = self.USER_AGENT
+        self._session.headers["Connection"] = "keep-alive"
+
+    def close(self) -> None:
+        """Closes the underlying HTTP session and its pooled connections."""
+        self._session.close()
+
+    def __enter__(self) -> "FixerClient":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
     def _get(self, endpoint: str, params: dict[str, str] | None = None) -> dict[str, Any]:
-        url: str = f"{self.BASE_URL}{endpoint}?access_key={self._api_key}"
-        
-        resp: requests.Response = requests.get(url, params=params)
-        data: dict[str, Any] = resp.json()
+        resp: requests.Response = self._session.get(
+            self.BASE_URL + endpoint,
+            params={**(params or {}), "access_key": self._api_key},
+            timeout=self.TIMEOUT,
+        )
+        data: dict[str, Any] = orjson.loads(resp.content) if orjson is not None else resp.json()
         
         if not data.get("success", False):
-            error_code = int(data.get("error", {}).get("code", 0))
+            # HTTP 429 is the same as the API rate limit error
+            error_code = int(data.get("error", {}).get("code", 106 if resp.status_code == 429 else 0))
             error_info = data.get("error", {}).get("info", "Unknown error")
-            raise FixerException(error_code, error_info)
+            retry_after: str = resp.headers.get("Retry-After", "")
+            raise FixerException(error_code, error_info, float(retry_after) if retry_after.isdigit() else None)
         
         return data
-        
+
+    def _cache_ttl(self, endpoint: str, params: dict[str, str] | None = None) -> int | None:
+        """Returns how long a response of the endpoint stays valid, or None if it never changes."""
+        last_date: str = (params or {}).get("end_date", "") if endpoint == "timeseries" else endpoint
+        # Historical rates are immutable, only latest and today's rates can still move.
+        # Fixer.io dates are in UTC, the local date may already be a day ahead or behind.
+        if last_date == "latest" or last_date >= datetime.now(timezone.utc).date().isoformat():
+            return self.CACHE_TTL
+        return None
+
+    def _read_cache(self, key: str, ttl: int | None) -> Any | None:
+        """Returns the cached value of the key, or None if it is missing, expired or caching is off."""
+        if self._cache_path is None or self.refresh:
+            return None
+
+        with self._cache_lock, shelve.open(self._cache_path) as cache:
+            entry: dict[str, Any] | None = cache.get(key)
+        if entry is not None and (ttl is None or time() - entry["fetched_at"] < ttl):
+            return entry["data"]
+        return None
+
+    def _write_cache(self, key: str, value: Any) -> None:
+        if self._cache_path is not None:
+            with self._cache_lock, shelve.open(self._cache_path) as cache:
+                cache[key] = {"fetched_at": time(), "data": value}
+
+    @staticmethod
+    def _cache_key(endpoint: str, params: dict[str, str] | None = None) -> str:
+        return endpoint + "?" + "&".join(f"{k}={v}" for k, v in sorted((params or {}).items()))
+
     def _send(self, endpoint: str, params: dict[str, str] | None = None) -> dict[str, Any]:
-        retries = self.retries
+        key: str = self._cache_key(endpoint, params)
+        cached: dict[str, Any] | None = self._read_cache(key, self._cache_ttl(endpoint, params))
+        if cached is not None:
+            return cached
+
+        data = self._send_with_breaker(endpoint, params)
+        self._write_cache(key, data)
+        return data
+
+    def _send_with_breaker(self, endpoint: str, params: dict[str, str] | None = None) -> dict[str, Any]:
+        if monotonic() < self._open_until:
+            raise FixerException(
+                0,
+                f"Calls are suspended for {self._open_until - monotonic():.0f}s "
+                f"after {self.BREAKER_THRESHOLD} consecutive failures",
+            )
+
+        try:
+            data = self._send_with_retries(endpoint, params)
+        except (FixerException, requests.RequestException, ValueError):
+            # ValueError covers responses that are not valid JSON
+            with self._breaker_lock:
+                self._fail_count += 1
+                if self._fail_count >= self.BREAKER_THRESHOLD:
+                    self._open_until = monotonic() + self.BREAKER_COOLDOWN
+                    self._fail_count = 0
+            raise
+
+        with self._breaker_lock:
+            self._fail_count = 0
+        return data
+
+    def _send_with_retries(self, endpoint: str, params: dict[str, str] | None = None) -> dict[str, Any]:
+        attempt = 0
+        waited = 0.0
         while True:
             try:
                 return self._get(endpoint, params)
             except FixerException as exc:
-                if exc.error_code == 106 and retries > 0:
-                    print(f"Rate limit reached. Attempts left: {retries}")
-                    retries -= 1
-                    sleep(1)
-                else:
+                # Only the rate limit error (106) is retryable, e.g. monthly limit (104) is not
+                if exc.error_code != 106 or attempt >= self.retries:
                     raise exc
-       
-        
-    def get_rates(self, currencies: list[str], at_date: str | None = None) -> dict[str, float]:
+
+                # Full jitter keeps concurrent callers from retrying in lockstep
+                delay = exc.retry_after if exc.retry_after is not None else random.uniform(
+                    0, min(self.BACKOFF_CAP, self.BACKOFF_BASE * 2 ** attempt)
+                )
+                if waited + delay > self.MAX_RETRY_WAIT:
+                    raise exc
+
+                attempt += 1
+                print(f"Rate limit reached. Retrying in {delay:.1f}s. Attempts left: {self.retries - attempt}")
+                sleep(delay)
+                waited += delay
+
+    def get_rates(self, currencies: Collection[str], at_date: str | None = None) -> dict[str, float]:
         """Gets current or historical exchange rates for specified currencies
         against USD. If at_date is None, pulls current rates.
 
         Args:
-            currencies: List of currency codes to get rates for.
+            currencies: Currency codes to get rates for. Codes are case-insensitive.
             at_date: The date for which to fetch rates, in 'YYYY-MM-DD' format. If None, pulls current rates.
 
         Returns:
-            A dictionary mapping currency codes to their USD exchange rate.
+            A dictionary mapping uppercase currency codes to their USD exchange rate.
 
         Raises:
             FixerException: If the API call is not successful or returns an error.
-            ValueError: If the currencies list is empty or the date format is invalid.
+            ValueError: If the currencies list is empty, contains an invalid code or the date format is invalid.
         """
-        if not currencies:
-            raise ValueError("Currencies list cannot be empty.")
+        requested = _normalize_currencies(currencies)
 
         if at_date is not None:
-            try:
-                datetime.strptime(at_date, "%Y-%m-%d")
-            except ValueError:
-                raise ValueError(f"Invalid date format: {at_date}. Expected format: YYYY-MM-DD")         
+            _parse_date(at_date)
         
-        currencies_to_get = set(currencies)
-        # Ensure USD is included for conversion purposes if using Free Plan
-        currencies_to_get.add("USD")
+        endpoint: str = 'latest' if at_date is None else at_date
 
-        data: dict[str, Any] = self._send(
-            'latest' if at_date is None else at_date,
-            {"symbols": ",".join(currencies_to_get)}
-        )
+        # Ensure USD is included for conversion purposes if using Free Plan.
+        # Symbols are sorted to keep the request (and its cache key) stable.
+        params: dict[str, str] = {"symbols": ",".join(sorted(requested | {"USD"}))}
+        data: dict[str, Any] | None = None
 
-        # Free plan is EUR-based, convert to USD
-        rates_eur_base: dict[str, float] = data["rates"]
-        eur_to_usd_rate: float = rates_eur_base.get("USD", 0)
+        eur_to_usd_rate: float | None = self._eur_usd_cache.get(endpoint)
+        if eur_to_usd_rate is not None:
+            # The EUR->USD rate of that date is known, so USD does not have to be requested.
+            # A cached response that includes USD still beats a new API call.
+            data = self._read_cache(self._cache_key(endpoint, params), self._cache_ttl(endpoint))
+            if data is None:
+                symbols = requested - {"USD"}
+                if not symbols:
+                    return {"USD": 1.0}
+                data = self._send(endpoint, {"symbols": ",".join(sorted(symbols))})
+        else:
+            data = self._send(endpoint, params)
 
-        if eur_to_usd_rate == 0:
-            raise RuntimeError("USD rate not found in API response, cannot convert to USD base.")
+            # Free plan is EUR-based, convert to USD
+            eur_to_usd_rate = data["rates"].get("USD", 0)
+            if eur_to_usd_rate == 0:
+                raise RuntimeError("USD rate not found in API response, cannot convert to USD base.")
 
-        rates_usd_base: dict[str, float] = {}
-        for currency, rate_eur in rates_eur_base.items():
-            if currency == "USD":
-                rates_usd_base[currency] = 1.0
-            else:
-                rates_usd_base[currency] = rate_eur / eur_to_usd_rate
+            if self._cache_ttl(endpoint) is None:
+                self._eur_usd_cache[endpoint] = eur_to_usd_rate
 
-        if "USD" not in currencies:
-            # Remove USD if it was not originally requested
-            rates_usd_base.pop("USD", None)
+        return _to_usd_base(data["rates"], eur_to_usd_rate, keep_usd="USD" in requested)
 
-        return rates_usd_base
+    def get_rates_bulk(
+        self, currencies: Collection[str], dates: list[str], max_workers: int = 4
+    ) -> dict[str, dict[str, float]]:
+        """Gets historical exchange rates for several dates against USD.
+        The API calls are issued concurrently, sharing the session connection pool.
 
+        Args:
+            currencies: Currency codes to get rates for.
+            dates: The dates for which to fetch rates, in 'YYYY-MM-DD' format.
+            max_workers: Maximum number of concurrent API calls.
 
-if __name__ == "__main__":
-    def parse_arguments() -> argparse.Namespace:
-        """Parses command-line arguments.
+        Returns:
+            A dictionary mapping each date to a dictionary of currency codes and their USD exchange rate.
+
+        Raises:
+            FixerException: If any API call is not successful or returns an error.
+            ValueError: If the currencies list is empty or a date format is invalid.
+        """
+        # Fail before any API call, so a typo does not spend quota on the other dates
+        for at_date in dates:
+            _parse_date(at_date)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(lambda at_date: self.get_rates(currencies, at_date), dates)
+            return dict(zip(dates, results))
+
+    def get_rates_timeseries(
+        self, currencies: Collection[str], start_date: str, end_date: str
+    ) -> dict[str, dict[str, float]]:
+        """Gets historical exchange rates for a range of dates against USD using the
+        timeseries endpoint, with one API call per TIMESERIES_MAX_DAYS days.
+        The timeseries endpoint is not available on the Free Plan.
+
+        Args:
+            currencies: Currency codes to get rates for.
+            start_date: The first date of the range, in 'YYYY-MM-DD' format.
+            end_date: The last date of the range (inclusive), in 'YYYY-MM-DD' format.
 
         Returns:
-            Parsed arguments namespace.
+            A dictionary mapping each date to a dictionary of currency codes and their USD exchange rate.
+
+        Raises:
+            FixerException: If an API call is not successful or returns an error. The error code
+                is 105 if the current plan does not support the timeseries endpoint. This is
+                remembered for UNSUPPORTED_TTL seconds and raised without calling the API again.
+            ValueError: If the currencies list is empty, a date format is invalid or
+                the start date is after the end date.
         """
-        parser = argparse.ArgumentParser(
-            description="Collect exchange rates from Fixer.io API"
-        )
+        requested = _normalize_currencies(currencies)
+        start, end = _parse_date(start_date), _parse_date(end_date)
+        if start > end:
+            raise ValueError(f"Start date {start_date} is after end date {end_date}")
 
-        parser.add_argument(
-            "--date",
-            type=str,
-            help="Date for historical rates in YYYY-MM-DD format. If not provided, fetches current rates.",
-        )
+        # Failed calls are not cached, so remember that the plan has no timeseries
+        # to not spend a request on every run
+        unsupported_key: str = "unsupported:timeseries"
+        if "timeseries" not in self._unsupported:
+            info: str | None = self._read_cache(unsupported_key, self.UNSUPPORTED_TTL)
+            if info is not None:
+                self._unsupported["timeseries"] = info
+        if "timeseries" in self._unsupported:
+            raise FixerException(105, self._unsupported["timeseries"])
 
-        parser.add_argument(
-            "--output",
-            type=str,
-            help="Path to the output CSV file. If not provided, a default name will be used."
-        )
+        rates_by_date: dict[str, dict[str, float]] = {}
+        while start <= end:
+            chunk_end = min(end, start + timedelta(days=self.TIMESERIES_MAX_DAYS - 1))
+            try:
+                data: dict[str, Any] = self._send("timeseries", {
+                    "start_date": start.isoformat(),
+                    "end_date": chunk_end.isoformat(),
+                    "symbols": ",".join(sorted(requested | {"USD"})),
+                })
+            except FixerException as exc:
+                # 105: the endpoint is not supported by the current plan
+                if exc.error_code == 105:
+                    self._unsupported["timeseries"] = exc.message
+                    self._write_cache(unsupported_key, exc.message)
+                raise exc
+
+            # Free plan is EUR-based, convert to USD
+            for rates_date, rates_eur_base in data["rates"].items():
+                eur_to_usd_rate: float = rates_eur_base.get("USD", 0)
+                if eur_to_usd_rate == 0:
+                    raise RuntimeError(f"USD rate for {rates_date} not found in API response, cannot convert to USD base.")
+
+                if self._cache_ttl(rates_date) is None:
+                    self._eur_usd_cache[rates_date] = eur_to_usd_rate
+                rates_by_date[rates_date] = _to_usd_base(rates_eur_base, eur_to_usd_rate, keep_usd="USD" in requested)
+
+            start = chunk_end + timedelta(days=1)
+
+        return rates_by_date
+
+
+def parse_arguments(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parses command-line arguments.
+
+    Args:
+        argv: Arguments to parse. If None, uses sys.argv.
+
+    Returns:
+        Parsed arguments namespace.
+    """
+    parser = argparse.ArgumentParser(
+        description="Collect exchange rates from Fixer.io API"
+    )
+
+    parser.add_argument(
+        "--date",
+        type=str,
+        help=(
+            "Date for historical rates in YYYY-MM-DD format. Accepts a comma-separated list of dates "
+            "or a range in YYYY-MM-DD:YYYY-MM-DD format. If not provided, fetches current rates."
+        ),
+    )
 
-        currency_group = parser.add_mutually_exclusive_group()
-        currency_group.add_argument(
-            "--currencies",
-            type=str,
-            help="Comma-separated list of currency codes to fetch rates for."
+    parser.add_argument(
+        "--output",
+        type=str,
+        help=(
+            "Path to the output CSV file, or the dataset folder for Parquet format. "
+            "If not provided, a default name will be used."
         )
-        currency_group.add_argument(
-            "--currencies-file",
-            type=str,
-            help="Path to the currencies file. Default is currencies.txt in the current working folder."
+    )
+
+    parser.add_argument(
+        "--format",
+        choices=["csv", "parquet"],
+        default="csv",
+        help=(
+            "Output format. 'parquet' writes a dataset partitioned by date, which new dates are "
+            "appended to. Requires pyarrow. Default is csv."
         )
-        return parser.parse_args()
+    )
+
+    currency_group = parser.add_mutually_exclusive_group()
+    currency_group.add_argument(
+        "--currencies",
+        type=str,
+        help="Comma-separated list of currency codes to fetch rates for."
+    )
+    currency_group.add_argument(
+        "--currencies-file",
+        type=str,
+        help="Path to the currencies file. Default is currencies.txt in the current working folder."
+    )
+
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Ignore cached API responses and fetch fresh rates from Fixer.io."
+    )
+    return parser.parse_args(argv)
+
+
+def parse_dates(value: str) -> list[str]:
+    """Parses the --date argument into a list of dates.
+
+    Args:
+        value: A single date, a comma-separated list of dates or a range
+            in 'YYYY-MM-DD:YYYY-MM-DD' format (both ends inclusive).
+
+    Returns:
+        List of dates in 'YYYY-MM-DD' format.
+
+    Raises:
+        ValueError: If a range end is not a valid date or the range is reversed.
+    """
+    if ":" not in value:
+        return [d.strip() for d in value.split(",") if d.strip()]
 
-    args = parse_arguments()
-    
-    API_KEY: str = os.getenv("FIXER_API_KEY", "")
-    if not API_KEY:
+    start_str, end_str = (d.strip() for d in value.split(":", 1))
+    try:
+        start = _parse_date(start_str)
+        end = _parse_date(end_str)
+    except ValueError:
+        raise ValueError(f"Invalid date range: {value}. Expected format: YYYY-MM-DD:YYYY-MM-DD")
+    if start > end:
+        raise ValueError(f"Invalid date range: {value}. Start date is after end date")
+
+    return [(start + timedelta(days=i)).isoformat() for i in range((end - start).days + 1)]
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Fetches exchange rates and saves them to a CSV file or a Parquet dataset.
+
+    Args:
+        argv: Command-line arguments. If None, uses sys.argv.
+    """
+    args = parse_arguments(argv)
+
+    api_key: str = os.getenv("FIXER_API_KEY", "")
+    if not api_key:
         raise ValueError("FIXER_API_KEY environment variable must be set")
 
-    currencies: list[str] = []
+    currencies: set[str]
     if args.currencies:
-        currencies = [c.strip() for c in args.currencies.split(",")]
+        currencies = {c.strip().upper() for c in args.currencies.split(",") if c.strip()}
     else:
         file_path = Path(args.currencies_file if args.currencies_file else "currencies.txt").expanduser()
-        with open(file_path, "r") as f:
-            currencies = [line.strip() for line in f if line.strip()]
-    
+        currencies = {line.strip().upper() for line in file_path.read_text().splitlines() if line.strip()}
+
     if len(currencies) == 0:
         print("Currency list is empty. Please add currency codes to currencies.txt.")
         exit(1)
-    elif len(currencies) == 1 and currencies[0] == "USD":
+    elif currencies == {"USD"}:
         print("Currency list contains only USD. No rates to fetch.")
         exit(1)
 
-    if args.date:
-        try:
-            datetime.strptime(args.date, "%Y-%m-%d")
-        except ValueError:
-            raise ValueError(f"Invalid date format: {args.date}. Expected format: YYYY-MM-DD")
-    
-    print(f"Fetching {'historical' if args.date else 'current'} rates for {currencies}")
-
-    fixer = FixerClient(API_KEY)
-    rates: dict[str, float] = fixer.get_rates(currencies, args.date)
-    
-    print(f"Successfully got {len(rates)} rates")
-
-    # Use today's date for current rates
-    date_str: str = args.date or datetime.now().strftime('%Y-%m-%d')
-    
-    records: list[dict[str, Any]] = [
-        dict(date=date_str, currency=currency, usd_rate=rate)
-        for currency, rate in rates.items()
-    ]
-
-    df: pd.DataFrame = pd.DataFrame(records)
-    if args.output:
-        output_filename = Path(args.output).expanduser()
+    # Dates are validated by FixerClient before any API call is made
+    dates: list[str] = parse_dates(args.date) if args.date else []
+
+    print(f"Fetching {'historical' if dates else 'current'} rates for {sorted(currencies)}")
+
+    with FixerClient(api_key, cache_path=".fxrate_cache", refresh=args.refresh) as fixer:
+        rates_by_date: dict[str, dict[str, float]]
+        if len(dates) > 1 and ":" in args.date:
+            # A range of dates can be fetched in one call on paid plans
+            try:
+                rates_by_date = fixer.get_rates_timeseries(currencies, dates[0], dates[-1])
+            except FixerException as exc:
+                # 105: the endpoint is not supported by the current plan
+                if exc.error_code != 105:
+                    raise exc
+                print("Timeseries are not available on the current plan. Fetching dates one by one.")
+                rates_by_date = fixer.get_rates_bulk(currencies, dates)
+        elif len(dates) > 1:
+            rates_by_date = fixer.get_rates_bulk(currencies, dates)
+        else:
+            at_date: str | None = dates[0] if dates else None
+            # Use today's date for current rates
+            rates_by_date = {at_date or datetime.now().strftime('%Y-%m-%d'): fixer.get_rates(currencies, at_date)}
+
+    print(f"Successfully got {sum(len(rates) for rates in rates_by_date.values())} rates")
+
+    date_str: str = "_".join(sorted({min(rates_by_date), max(rates_by_date)}))
+
+    import pandas as pd
+
+    df: pd.DataFrame = pd.DataFrame({
+        "date": [rates_date for rates_date, rates in rates_by_date.items() for _ in rates],
+        "currency": [currency for rates in rates_by_date.values() for currency in rates],
+        "usd_rate": [rate for rates in rates_by_date.values() for rate in rates.values()],
+    })
+    if args.format == "parquet":
+        output_filename = Path(args.output if args.output else "rates").expanduser()
+        # One partition per date, fetching a date again replaces its partition
+        df.to_parquet(
+            output_filename,
+            engine="pyarrow",
+            partition_cols=["date"],
+            compression="zstd",
+            index=False,
+            existing_data_behavior="delete_matching",
+        )
     else:
-        output_filename = f"exchange_rates_{date_str}.csv"
-    df.to_csv(output_filename, index=False)
-    
+        if args.output:
+            output_filename = Path(args.output).expanduser()
+        else:
+            output_filename = f"exchange_rates_{date_str}.csv"
+        df.to_csv(output_filename, index=False, lineterminator="\n")
+
     print(f"Data saved to {output_filename}")
+
+
+if __name__ == "__main__":
+    main()